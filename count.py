@@ -1,7 +1,22 @@
-import json
 import argparse
 from pathlib import Path
 
+try:
+    from orjson import loads as json_loads
+except ImportError:  # orjson is optional; stdlib json also accepts bytes
+    from json import loads as json_loads
+
+
+def _first_byte(f) -> bytes:
+    """Return the first non-whitespace byte of a binary file, or b'' if empty."""
+    while True:
+        chunk = f.read(4096)
+        if not chunk:
+            return b''
+        stripped = chunk.lstrip()
+        if stripped:
+            return stripped[:1]
+
 
 def count_objects_in_file(path: str) -> int:
     """Return the number of top-level JSON objects in the file.
@@ -9,10 +24,29 @@ def count_objects_in_file(path: str) -> int:
     - If the JSON is a list, returns len(list).
     - If the JSON is a dict/object, returns 1.
     - Otherwise returns 0.
+
+    Lists are counted by streaming their items with ijson when it is
+    installed, so the document is never fully materialized.
     """
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(path, 'rb') as f:
+            first = _first_byte(f)
+            if first == b'{':
+                # A top-level object always counts as one; no need to parse it
+                return 1
+            if first == b'[':
+                try:
+                    import ijson
+                except ImportError:
+                    pass
+                else:
+                    f.seek(0)
+                    try:
+                        return sum(1 for _ in ijson.items(f, 'item'))
+                    except Exception:
+                        pass  # fall back to a full parse below
+            f.seek(0)
+            data = json_loads(f.read())
     except Exception as e:
         print(f"Error reading {path}: {e}")
         return 0
@@ -1,41 +1,89 @@
 import os
 import redis
+from itertools import islice
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
 # read values from .env
-host = os.getenv("REDIS_HOST")
-port = int(os.getenv("REDIS_PORT"))
+host = os.getenv("REDIS_HOST", "localhost")
+port = int(os.getenv("REDIS_PORT", "6379"))
 username = os.getenv("REDIS_USERNAME")
 password = os.getenv("REDIS_PASSWORD")
+# optional: path to a local unix socket, which skips the TCP stack entirely
+unix_socket = os.getenv("REDIS_UNIX_SOCKET")
+
+if unix_socket:
+    connection = {"unix_socket_path": unix_socket}
+else:
+    # redis-py already sets TCP_NODELAY on every TCP connection
+    connection = {
+        "host": host,
+        "port": port,
+        "socket_keepalive": True,
+        "socket_connect_timeout": 5,
+        "health_check_interval": 30,
+    }
 
 # connect to redis
 r = redis.Redis(
-    host=host,
-    port=port,
+    **connection,
     username=username,
     password=password,
-    decode_responses=True
+    decode_responses=False
 )
-# Get all keys
-keys = r.keys("*")
-print("Keys in Redis:", keys)
-
-for key in keys:
-    key_type = r.type(key).decode() if isinstance(r.type(key), bytes) else r.type(key)
-
-    if key_type == "string":
-        value = r.get(key)
-    elif key_type == "list":
-        value = r.lrange(key, 0, -1)
-    elif key_type == "set":
-        value = list(r.smembers(key))
-    elif key_type == "hash":
-        value = r.hgetall(key)
-    else:
-        value = f"(Unhandled type: {key_type})"
-
-    print(f"{key} ({key_type}) => {value}")
 
+
+def decode(value):
+    # Replies are raw bytes; decode only what gets printed
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    if isinstance(value, dict):
+        return {decode(k): decode(v) for k, v in value.items()}
+    return value
+
+
+def show_keys(keys):
+    # Fetch every key's type in one round-trip
+    pipe = r.pipeline(transaction=False)
+    for key in keys:
+        pipe.type(key)
+    key_types = [decode(t) for t in pipe.execute()]
+
+    # Then fetch every value in a second round-trip
+    for key, key_type in zip(keys, key_types):
+        if key_type == "string":
+            pipe.get(key)
+        elif key_type == "list":
+            pipe.lrange(key, 0, -1)
+        elif key_type == "set":
+            pipe.smembers(key)
+        elif key_type == "hash":
+            pipe.hgetall(key)
+    values = iter(pipe.execute())
+
+    for key, key_type in zip(keys, key_types):
+        if key_type in ("string", "list", "set", "hash"):
+            value = next(values)
+            if key_type == "set":
+                value = list(value)
+        else:
+            value = f"(Unhandled type: {key_type})"
+
+        print(f"{decode(key)} ({key_type}) => {decode(value)}")
+
+
+# Walk the keyspace with SCAN instead of blocking on KEYS *, displaying keys
+# in batches so the whole key list is never held in memory
+BATCH_SIZE = 500
+
+total = 0
+scanned = r.scan_iter(match="*", count=1000)
+while keys := list(islice(scanned, BATCH_SIZE)):
+    show_keys(keys)
+    total += len(keys)
+
+print("Keys in Redis:", total)
@@ -1,9 +1,17 @@
 import os
-import json
+import mmap
 import argparse
+from itertools import chain, islice
 from pathlib import Path
 from dotenv import load_dotenv
-from typing import Iterable, List
+from typing import Iterable, List, Tuple
+
+try:
+    from orjson import loads as json_loads
+    HAVE_ORJSON = True
+except ImportError:  # orjson is optional; stdlib json also accepts bytes
+    from json import loads as json_loads
+    HAVE_ORJSON = False
 
 try:
     import redis
@@ -12,94 +20,177 @@ except Exception as e:  # pragma: no cover - redis is required at runtime
 
 load_dotenv()
 
+# Connection settings, read once at import
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_USERNAME = os.getenv("REDIS_USERNAME")
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
+REDIS_UNIX_SOCKET = os.getenv("REDIS_UNIX_SOCKET")
+
 
 def connect_redis():
-    host = os.getenv("REDIS_HOST")
-    port = int(os.getenv("REDIS_PORT", 6379))
-    username = os.getenv("REDIS_USERNAME")
-    password = os.getenv("REDIS_PASSWORD")
+    # redis-py parses replies with hiredis automatically when it is installed
+    # (pip install hiredis); the client name makes the loader visible in CLIENT LIST
+    if REDIS_UNIX_SOCKET:
+        # A local unix socket skips the TCP stack entirely
+        return redis.Redis(unix_socket_path=REDIS_UNIX_SOCKET, username=REDIS_USERNAME, password=REDIS_PASSWORD,
+                           decode_responses=False, client_name='bulk-loader')
 
-    return redis.Redis(host=host, port=port, username=username, password=password, decode_responses=True)
+    # redis-py already sets TCP_NODELAY on every TCP connection
+    return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, username=REDIS_USERNAME, password=REDIS_PASSWORD,
+                       decode_responses=False,
+                       socket_keepalive=True, socket_connect_timeout=5, health_check_interval=30,
+                       client_name='bulk-loader')
 
 
 def chunked(iterable: Iterable, size: int):
-    batch = []
-    for item in iterable:
-        batch.append(item)
-        if len(batch) >= size:
-            yield batch
-            batch = []
-    if batch:
+    # Validated here rather than in the generator below so a bad size fails
+    # on the call itself, before callers go on to clear any keys
+    if size < 1:
+        raise ValueError(f'chunk size must be at least 1, got {size}')
+    return _chunked(iter(iterable), size)
+
+
+def _chunked(it, size: int):
+    # islice does the per-item work in C instead of an append loop
+    while batch := list(islice(it, size)):
         yield batch
 
 
-def stream_array_with_ijson(path: Path, key: str):
-    # ijson yields items from a JSON stream without loading whole file
+# Read size handed to the ijson parser (its default is 64 KiB)
+IJSON_BUF_SIZE = 1 << 20
+
+
+def stream_arrays_with_ijson(path: Path, keys: Iterable[str]):
+    # ijson yields items from a JSON stream without loading whole file.
+    # Items of every requested top-level array are yielded as (key, item)
+    # in file order, so the file is only read and parsed once, and only up
+    # to the end of the last requested array.
     try:
         import ijson
     except Exception:
         raise RuntimeError("ijson not available")
 
+    prefixes = {f'{key}.item': key for key in keys}
+    pending = set(keys)
+    builder = None
+    with path.open('rb') as f:
+        for prefix, event, value in ijson.parse(f, buf_size=IJSON_BUF_SIZE):
+            if builder is not None:
+                # Building an object/array item, as ijson.items would; only the
+                # item's own closing event comes back at the item prefix
+                builder.event(event, value)
+                if prefix == item_prefix and event in ('end_map', 'end_array'):
+                    yield prefixes[item_prefix], builder.value
+                    builder = None
+                continue
+            key = prefixes.get(prefix)
+            if key is not None:
+                if event in ('start_map', 'start_array'):
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                    item_prefix = prefix
+                else:
+                    yield key, value
+            elif event == 'end_array' and prefix in pending:
+                # Stop once every requested array is complete; whatever follows
+                # in the file is never read or tokenized
+                pending.discard(prefix)
+                if not pending:
+                    return
+
+
+def load_json_file(path: Path):
+    # Memory-map the file so orjson parses straight from the page cache instead
+    # of from an intermediate bytes copy. mmap can't map an empty file and
+    # stdlib json can't parse a memoryview, so those cases read the bytes.
     with path.open('rb') as f:
-        prefix = f'{key}.item'
-        for item in ijson.items(f, prefix):
-            yield item
+        if not HAVE_ORJSON or os.fstat(f.fileno()).st_size == 0:
+            return json_loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return json_loads(view)
 
 
 def load_list_from_json(path: Path, key: str):
     # Fallback: load whole file and return list at key (may use lots of memory)
-    with path.open('r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = load_json_file(path)
     if isinstance(data, dict) and key in data and isinstance(data[key], list):
         return data[key]
     # If top level is list and key is not present, return empty
     return []
 
 
-def push_institutions(r, institutes_iter: Iterable[str], chunk_size: int = 1000):
-    total = 0
+def rpush_batches(r, batches: Iterable[Tuple[str, List[str]]]):
+    # Write one variadic RPUSH per (key, batch) straight to a pooled connection,
+    # skipping redis-py's pipeline bookkeeping. Replies (one integer each)
+    # are only read once every batch has been sent, so sending overlaps with
+    # producing the next batch instead of waiting a round-trip per batch.
+    # Returns the number of values pushed per key.
+    conn = r.connection_pool.get_connection()
+    sent = 0
+    totals = {}
+    try:
+        for key, batch in batches:
+            # No health check mid-stream: its PING would read back a pending
+            # RPUSH reply, fail, and reconnect, abandoning the batches already sent
+            conn.send_packed_command(conn.pack_command('RPUSH', key, *batch), check_health=False)
+            sent += 1
+            totals[key] = totals.get(key, 0) + len(batch)
+        for _ in range(sent):
+            conn.read_response()
+    except BaseException:
+        # Unread replies would leave the connection out of sync for its next user
+        conn.disconnect()
+        raise
+    finally:
+        r.connection_pool.release(conn)
+    return totals
+
+
+def push_institutions_and_companies(r, items: Iterable[Tuple[str, str]], chunk_size: int = 1000):
+    # Route (key, value) items from a single pass over the file: institutions
+    # are pushed as they stream, companies are pushed deduped as they stream,
+    # and then institutions are appended to companies only if new. Only the
+    # institution strings are held in memory for that final append.
+    # Dedupe is local while preserving insertion order, so no Redis SET or
+    # per-item round-trip is needed. Clear the keys first
+    batches = chunked(items, chunk_size)
     r.delete('institutions')
-    pipe = r.pipeline()
-    for batch in chunked(institutes_iter, chunk_size):
-        for inst in batch:
-            pipe.rpush('institutions', inst)
-        pipe.execute()
-        total += len(batch)
-    return total
-
-
-def push_companies_deduped(r, companies_iter: Iterable[str], chunk_size: int = 1000):
-    # We'll maintain a Redis SET 'companies:set' to dedupe while preserving insertion order
-    # Clear keys first
     r.delete('companies')
-    r.delete('companies:set')
-
-    total_added = 0
 
-    for batch in chunked(companies_iter, chunk_size):
-        pipe = r.pipeline()
-        # Issue SADD commands first
-        for c in batch:
-            pipe.sadd('companies:set', c)
-        sadd_results = pipe.execute()
-
-        # For entries that were newly added (sadd_results == 1), push to list
-        to_push = [c for c, res in zip(batch, sadd_results) if res]
-        if to_push:
-            pipe = r.pipeline()
-            for c in to_push:
-                pipe.rpush('companies', c)
-            pipe.execute()
-            total_added += len(to_push)
-
-    return total_added
+    seen = set()
+    institutions = []
+
+    def dedupe(values):
+        # dict.fromkeys drops in-batch repeats in C, keeping first-seen order
+        to_push = [c for c in dict.fromkeys(values) if c not in seen]
+        seen.update(to_push)
+        return to_push
+
+    def routed():
+        for batch in batches:
+            insts = [v for k, v in batch if k == 'institution']
+            if insts:
+                institutions.extend(insts)
+                yield 'institutions', insts
+            companies = dedupe([v for k, v in batch if k == 'companies'])
+            if companies:
+                yield 'companies', companies
+        for batch in chunked(institutions, chunk_size):
+            companies = dedupe(batch)
+            if companies:
+                yield 'companies', companies
+
+    totals = rpush_batches(r, routed())
+    return totals.get('institutions', 0), totals.get('companies', 0)
 
 
 def iterate_companies_and_institutions(path: Path, use_ijson: bool):
-    # Yields two generators: institutions_iter, companies_iter and a boolean
-    # indicating whether ijson streaming was actually used.
+    # Returns one iterator of ('institution' | 'companies', value) pairs covering
+    # both arrays, read in a single pass over the file.
     if use_ijson:
-        # Check ijson is importable up-front. stream_array_with_ijson is a generator
+        # Check ijson is importable up-front. stream_arrays_with_ijson is a generator
         # function so its body (and import) doesn't run until iteration — that
         # caused a RuntimeError to be raised later during iteration. Importing
         # here forces an immediate failure and lets us fall back safely.
@@ -107,25 +198,33 @@ def iterate_companies_and_institutions(path: Path, use_ijson: bool):
             import ijson  # type: ignore
         except Exception:
             use_ijson = False
-        else:
-            institutions = stream_array_with_ijson(path, 'institution')
-            companies = stream_array_with_ijson(path, 'companies')
-            return institutions, companies, True
 
-    # Fallback load entire lists
-    data = None
-    with path.open('r', encoding='utf-8') as f:
-        data = json.load(f)
+    if use_ijson:
+        stream = stream_arrays_with_ijson(path, ('institution', 'companies'))
+    else:
+        # Fallback load entire lists
+        data = load_json_file(path)
+        if not isinstance(data, dict):
+            data = {}
+        stream = chain(
+            (('institution', x) for x in data.get('institution', [])),
+            (('companies', x) for x in data.get('companies', [])),
+        )
+
+    return stream
+
 
-    institutions = data.get('institution', []) if isinstance(data, dict) else []
-    companies = data.get('companies', []) if isinstance(data, dict) else []
-    return iter(institutions), iter(companies), False
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'must be a positive integer, got {value}')
+    return number
 
 
 def main():
     parser = argparse.ArgumentParser(description='Efficiently push institutions and companies into Redis')
     parser.add_argument('-i', '--input', default='institutes.json', help='Input JSON file (default: institutes.json)')
-    parser.add_argument('--chunk', type=int, default=1000, help='Batch size for Redis pipeline (default: 1000)')
+    parser.add_argument('--chunk', type=positive_int, default=1000, help='Batch size for Redis pipeline (default: 1000)')
     parser.add_argument('--no-ijson', action='store_true', help='Disable ijson streaming even if installed')
     args = parser.parse_args()
 
@@ -138,40 +237,18 @@ def main():
 
     use_ijson = (not args.no_ijson)
     try:
-        institutes_iter, companies_iter, used_ijson = iterate_companies_and_institutions(path, use_ijson)
+        items = iterate_companies_and_institutions(path, use_ijson)
     except Exception as e:
         print(f'Error reading input JSON: {e}')
         raise SystemExit(3)
 
-    # Push institutions
-    print('Pushing institutions...')
-    inst_count = push_institutions(r, institutes_iter, chunk_size=args.chunk)
-
-    # For companies we want existing companies first, then append institutions deduped.
-    # We'll first push companies from the file, then also push institutions into companies only if new.
-    print('Pushing companies from input (deduplicating using Redis SET)...')
-    companies_added = push_companies_deduped(r, companies_iter, chunk_size=args.chunk)
-
-    # Now also append institutions into companies if they are new
-    # Re-open institutions iterator if possible
-    # Simplest approach: stream institutions again (using ijson) or reload
-    try:
-        if used_ijson:
-            inst_again = stream_array_with_ijson(path, 'institution')
-        else:
-            # reload file and get institutions list
-            with path.open('r', encoding='utf-8') as f:
-                data = json.load(f)
-            inst_again = iter(data.get('institution', []))
-    except Exception:
-        inst_again = []
-
-    print('Appending institutions into companies (deduped)...')
-    companies_added_from_insts = push_companies_deduped(r, inst_again, chunk_size=args.chunk)
+    # For companies we want existing companies first, then institutions appended
+    # only if new; both lists are filled from the same single pass over the file.
+    print('Pushing institutions and companies (deduplicating)...')
+    inst_count, total_companies = push_institutions_and_companies(r, items, chunk_size=args.chunk)
 
     print(f'Inserted {inst_count} institutions into Redis list "institutions"')
-    total_companies = r.llen('companies')
-    print(f'Inserted {total_companies} unique companies into Redis list "companies" (newly added from file: {companies_added}, from institutions: {companies_added_from_insts})')
+    print(f'Inserted {total_companies} unique companies into Redis list "companies"')
 
 
 if __name__ == '__main__':
@@ -1,29 +1,49 @@
-import redis
-import json
+import asyncio
 import os
+import mmap
 from dotenv import load_dotenv
+from redis.asyncio import Redis
+
+try:
+    from orjson import loads as json_loads
+    HAVE_ORJSON = True
+except ImportError:  # orjson is optional; stdlib json also accepts bytes
+    from json import loads as json_loads
+    HAVE_ORJSON = False
 
 # Load environment variables
 load_dotenv()
 
 # read values from .env
-host = os.getenv("REDIS_HOST")
-port = int(os.getenv("REDIS_PORT"))
+host = os.getenv("REDIS_HOST", "localhost")
+port = int(os.getenv("REDIS_PORT", "6379"))
 username = os.getenv("REDIS_USERNAME")
 password = os.getenv("REDIS_PASSWORD")
+# optional: path to a local unix socket, which skips the TCP stack entirely
+unix_socket = os.getenv("REDIS_UNIX_SOCKET")
 
-# connect to redis
-r = redis.Redis(
-    host=host,
-    port=port,
-    username=username,
-    password=password,
-    decode_responses=True
-)
+if unix_socket:
+    connection = {"unix_socket_path": unix_socket}
+else:
+    # redis-py already sets TCP_NODELAY on every TCP connection
+    connection = {
+        "host": host,
+        "port": port,
+        "socket_keepalive": True,
+        "socket_connect_timeout": 5,
+        "health_check_interval": 30,
+    }
 
 # Read the JSON file
-with open("institutes.json", "r", encoding="utf-8") as f:
-    data = json.load(f)
+# orjson parses the memory-mapped file directly, avoiding an extra bytes copy;
+# stdlib json and empty files (which can't be mapped) read the bytes instead.
+with open("institutes.json", "rb") as f:
+    if not HAVE_ORJSON or os.fstat(f.fileno()).st_size == 0:
+        data = json_loads(f.read())
+    else:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                data = json_loads(view)
 
 institutions = data["institution"]
 companies = data["companies"]
@@ -32,17 +52,40 @@ companies = data["companies"]
 # institutions will be appended after existing companies, but we remove duplicates
 companies = list(dict.fromkeys(companies + institutions))
 
-# Clear old keys
-r.delete("institutions")
-r.delete("companies")
-
 # Push lists into Redis
+# Send values with one variadic RPUSH per chunk instead of one command per item,
+# chunking so a single command never grows unbounded on very large lists.
+CHUNK_SIZE = 10_000
+
+
+async def push(r, key, values):
+    # All chunks of one key go out on a single pipeline so they stay in order;
+    # concurrent chunks on separate connections could interleave in the list.
+    async with r.pipeline(transaction=False) as pipe:
+        for i in range(0, len(values), CHUNK_SIZE):
+            pipe.rpush(key, *values[i:i + CHUNK_SIZE])
+        await pipe.execute()
+
+
+async def main():
+    # connect to redis
+    async with Redis(
+        **connection,
+        username=username,
+        password=password,
+        decode_responses=False
+    ) as r:
+        # Clear old keys
+        await r.delete("institutions", "companies")
+
+        # Both lists are in flight at once, each on its own connection
+        await asyncio.gather(
+            push(r, "institutions", institutions),
+            push(r, "companies", companies),
+        )
 
-for inst in institutions:
-    r.rpush("institutions", inst)
 
-for company in companies:
-    r.rpush("companies", company)
+asyncio.run(main())
 
 print("Inserted", len(institutions), "institutions into Redis")
 print("Inserted", len(companies), "companies into Redis")